@@ -1,5 +1,8 @@
 # manage.py
+import datetime
 import os
+import time
+import unittest
 
 from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
@@ -14,6 +17,16 @@ manager = Manager(app)
 manager.add_command('db', MigrateCommand)
 
 
+@manager.command
+def test():
+    """Runs the unit tests."""
+    tests = unittest.TestLoader().discover('project/tests', pattern='test*.py')
+    result = unittest.TextTestRunner(verbosity=2).run(tests)
+    if result.wasSuccessful():
+        return 0
+    return 1
+
+
 @manager.command
 def create_db():
     """Creates the db tables."""
@@ -26,5 +39,129 @@ def drop_db():
     db.drop_all()
 
 
+@manager.option('-g', '--group-by', dest='group_by', default='email')
+@manager.option('-w', '--window', dest='window', default=5, type=int,
+                help='window size in minutes')
+@manager.option('-H', '--hours', dest='hours', default=24, type=int)
+@manager.option('-e', '--event', dest='event', default=None)
+@manager.option('-m', '--min-failures', dest='min_failures', default=1, type=int)
+@manager.option('--email', dest='email', default=None)
+@manager.option('--ip', dest='ip', default=None)
+def auth_failures(group_by, window, hours, event, min_failures, email, ip):
+    """Prints auth failure rates per email/ip over time windows."""
+    rows = models.AuthEvent.failure_rates(
+        group_by=group_by,
+        window=datetime.timedelta(minutes=window),
+        since=datetime.datetime.utcnow() - datetime.timedelta(hours=hours),
+        event=event,
+        min_failures=min_failures,
+        email=email,
+        ip=ip
+    )
+    for row in rows:
+        print('{:%Y-%m-%d %H:%M}  {:<40} {:>6}/{:<6} {:.1%}'.format(
+            row['window_start'], str(row[group_by]),
+            row['failures'], row['attempts'], row['failure_rate']
+        ))
+
+
+def print_timings(label, timings):
+    timings = sorted(timings)
+    print('{:<9} mean: {:.2f}ms  p50: {:.2f}ms  p99: {:.2f}ms  max: {:.2f}ms'.format(
+        label,
+        sum(timings) / len(timings) * 1e3,
+        timings[len(timings) // 2] * 1e3,
+        timings[int(len(timings) * 0.99)] * 1e3,
+        timings[-1] * 1e3
+    ))
+
+
+@manager.option('-n', '--requests', dest='requests', default=2000, type=int,
+                help='requests per block')
+@manager.option('-r', '--rounds', dest='rounds', default=4, type=int)
+@manager.option('-e', '--email', dest='email', default='bench@example.com',
+                help='throwaway account, recreated and deleted by the bench')
+@manager.option('-P', '--phone', dest='phone', default='0000000000')
+@manager.option('-s', '--sink', dest='sink', default='mongo',
+                help="'mongo' writes to auth_events, 'bson' only encodes")
+def bench_auth_events(requests, rounds, email, phone, sink):
+    """Compares LoginAPI latency with auth event logging disabled and enabled."""
+    from bson import BSON
+    from mongoengine.errors import NotUniqueError
+    from project.server import events
+    from project.server.auth import views
+
+    def encode_only(documents):
+        for document in documents:
+            BSON.encode(document)
+        return len(documents)
+
+    # a throwaway account hashed with the minimum bcrypt cost, so hashing
+    # does not drown out the difference being measured
+    password = 'bench-password'
+    bcrypt_log_rounds = app.config.get('BCRYPT_LOG_ROUNDS')
+    app.config['BCRYPT_LOG_ROUNDS'] = 4
+    models.User.objects(email=email).delete()
+    try:
+        user = models.User(email=email, user_name='bench', phone=phone, password=password)
+        user.save()
+    except NotUniqueError:
+        print('Phone {} is already registered, pass another with --phone'.format(phone))
+        return
+    finally:
+        app.config['BCRYPT_LOG_ROUNDS'] = bcrypt_log_rounds
+
+    log = events.AuthEventLog(
+        capacity=app.config.get('AUTH_EVENT_BUFFER_SIZE'),
+        batch_size=app.config.get('AUTH_EVENT_BATCH_SIZE'),
+        flush_interval=app.config.get('AUTH_EVENT_FLUSH_INTERVAL'),
+        sink=events.insert_auth_events if sink == 'mongo' else encode_only
+    )
+    client = app.test_client()
+    payload = {'email': email, 'password': password}
+    log_auth_event = views.log_auth_event
+    timings = {'disabled': [], 'enabled': []}
+
+    def run_block(mode, count):
+        views.log_auth_event = (
+            log_auth_event if mode == 'enabled' else lambda *args, **kwargs: True
+        )
+        block = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post('/auth/login', json=payload)
+            block.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError('Login returned {}: {}'.format(
+                    response.status_code, response.get_data(as_text=True)
+                ))
+        # drain outside the timed block so no flush spills into the next one
+        log.flush()
+        return block
+
+    default_log = events.auth_event_log
+    events.auth_event_log = log
+    try:
+        run_block('disabled', min(requests, 100))  # warm up connections and caches
+        for i in range(rounds):
+            # alternate which mode goes first to cancel out ordering effects
+            order = ('disabled', 'enabled') if i % 2 == 0 else ('enabled', 'disabled')
+            for mode in order:
+                timings[mode].extend(run_block(mode, requests))
+    finally:
+        views.log_auth_event = log_auth_event
+        events.auth_event_log = default_log
+        log.close()
+        user.delete()
+    disabled, enabled = timings['disabled'], timings['enabled']
+    print('requests: {} x {} rounds  sink: {}'.format(requests, rounds, sink))
+    print_timings('disabled', disabled)
+    print_timings('enabled', enabled)
+    print('added mean: {:.3f}ms'.format(
+        (sum(enabled) / len(enabled) - sum(disabled) / len(disabled)) * 1e3
+    ))
+    print(log.stats())
+
+
 if __name__ == '__main__':
     manager.run()
@@ -6,6 +6,7 @@ from mongoengine.errors import NotUniqueError
 from project.server import bcrypt
 from project.server.models import User, BlacklistToken
 from project.server.helper import require_logged_in_user, get_auth_token
+from project.server.events import log_auth_event
 
 auth_blueprint = Blueprint('auth', __name__)
 
@@ -40,24 +41,28 @@ class RegisterAPI(MethodView):
                     'message': 'Successfully registered.',
                     'auth_token': auth_token.decode()
                 }
-                return make_response(jsonify(responseObject)), 201
             except NotUniqueError:
                 responseObject = {
                     'status': 'fail',
                     'message': 'User with Phone/Email already exists. Please Log in.'
                 }
+                log_auth_event('register', 'failure', 202, post_data.get('email'))
                 return make_response(jsonify(responseObject)), 202
             except Exception as e:
                 responseObject = {
                     'status': 'fail',
                     'message': 'Some error occurred. Please try again.'
                 }
+                log_auth_event('register', 'failure', 401, post_data.get('email'))
                 return make_response(jsonify(responseObject)), 401
+            log_auth_event('register', 'success', 201, post_data.get('email'), user)
+            return make_response(jsonify(responseObject)), 201
         else:
             responseObject = {
                 'status': 'fail',
                 'message': 'User already exists. Please Log in.',
             }
+            log_auth_event('register', 'failure', 202, post_data.get('email'), user)
             return make_response(jsonify(responseObject)), 202
 
 
@@ -83,12 +88,14 @@ class LoginAPI(MethodView):
                         'message': 'Successfully logged in.',
                         'auth_token': auth_token.decode()
                     }
+                    log_auth_event('login', 'success', 200, post_data.get('email'), user)
                     return make_response(jsonify(responseObject)), 200
             else:
                 responseObject = {
                     'status': 'fail',
                     'message': 'User does not exist.'
                 }
+                log_auth_event('login', 'failure', 404, post_data.get('email'), user)
                 return make_response(jsonify(responseObject)), 404
         except Exception as e:
             print(e)
@@ -96,6 +103,8 @@ class LoginAPI(MethodView):
                 'status': 'fail',
                 'message': 'Try again'
             }
+            email = post_data.get('email') if isinstance(post_data, dict) else None
+            log_auth_event('login', 'failure', 500, email)
             return make_response(jsonify(responseObject)), 500
 
 
@@ -116,12 +125,14 @@ class LogoutAPI(MethodView):
                 'status': 'success',
                 'message': 'Successfully logged out.'
             }
+            log_auth_event('logout', 'success', 200, user.email, user)
             return make_response(jsonify(responseObject)), 200
         except Exception as e:
             responseObject = {
                 'status': 'fail',
                 'message': e
             }
+            log_auth_event('logout', 'failure', 200, user.email, user)
             return make_response(jsonify(responseObject)), 200
 
 
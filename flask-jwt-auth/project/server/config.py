@@ -12,6 +12,11 @@ class BaseConfig:
     DEBUG = True
     BCRYPT_LOG_ROUNDS = 13
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # auth event log: in-memory buffer drained into Mongo in batches
+    AUTH_EVENT_BUFFER_SIZE = 10000
+    AUTH_EVENT_BATCH_SIZE = 500
+    AUTH_EVENT_FLUSH_INTERVAL = 2.0
+    AUTH_EVENT_TTL_SECONDS = 30 * 24 * 60 * 60
 
 
 class DevelopmentConfig(BaseConfig):
@@ -19,3 +24,10 @@ class DevelopmentConfig(BaseConfig):
     DEBUG = True
     BCRYPT_LOG_ROUNDS = 4
     SQLALCHEMY_DATABASE_URI = sqlite_local_base + database_name
+
+
+class TestingConfig(BaseConfig):
+    """Testing configuration."""
+    DEBUG = True
+    TESTING = True
+    BCRYPT_LOG_ROUNDS = 4
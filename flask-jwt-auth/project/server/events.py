@@ -0,0 +1,200 @@
+# project/server/events.py
+import atexit
+import datetime
+import os
+import threading
+from collections import deque
+
+from bson import BSON
+from bson.errors import InvalidDocument
+from flask import request
+from pymongo.errors import BulkWriteError
+
+from project.server import app
+from project.server.models import AuthEvent
+
+
+# longest valid email address; anything beyond is not worth keeping
+MAX_EMAIL_LENGTH = 254
+
+# raised while BSON-encoding a document, before anything is sent
+ENCODING_ERRORS = (InvalidDocument, UnicodeEncodeError)
+
+
+def _insert_many(collection, documents):
+    try:
+        collection.insert_many(documents, ordered=False)
+        return len(documents)
+    except BulkWriteError as e:
+        return e.details['nInserted']
+
+
+def _is_valid_document(document):
+    try:
+        BSON.encode(document, check_keys=True)
+        return True
+    except ENCODING_ERRORS:
+        return False
+
+
+def insert_auth_events(documents):
+    """
+    Writes a batch of auth events in a single round trip. Documents
+    that cannot be encoded are skipped instead of failing the batch.
+    :return: number of events written
+    """
+    collection = AuthEvent._get_collection()
+    try:
+        return _insert_many(collection, documents)
+    except ENCODING_ERRORS:
+        documents = [d for d in documents if _is_valid_document(d)]
+        return _insert_many(collection, documents) if documents else 0
+
+
+class AuthEventLog:
+    """
+    Bounded in-memory buffer of auth events drained by a background
+    flusher, so the request path never waits on Mongo.
+    """
+
+    def __init__(self, capacity, batch_size, flush_interval, sink=insert_auth_events):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sink = sink
+        self._reset()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._reset)
+
+    def record(self, document):
+        """
+        Queues one event. Returns False if the buffer is full and the
+        event was dropped.
+        """
+        self._ensure_worker()
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                self.dropped += 1
+                return False
+            self._buffer.append(document)
+            self.recorded += 1
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """
+        Drains the buffer into the sink, one batch at a time.
+        :return: number of events written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [
+                        self._buffer.popleft()
+                        for _ in range(min(self.batch_size, len(self._buffer)))
+                    ]
+                if not batch:
+                    return written
+                try:
+                    inserted = self.sink(batch)
+                except Exception:
+                    self.failed += len(batch)
+                    app.logger.exception('Failed to write %d auth events', len(batch))
+                    return written
+                if inserted < len(batch):
+                    app.logger.warning(
+                        'Rejected %d auth events', len(batch) - inserted
+                    )
+                self.failed += len(batch) - inserted
+                self.flushed += inserted
+                written += inserted
+
+    def close(self):
+        """
+        Stops the flusher and writes whatever is still buffered.
+        """
+        self._stopped = True
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(self.flush_interval + 5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            'pending': pending,
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'flushed': self.flushed,
+            'failed': self.failed,
+        }
+
+    def _reset(self):
+        # also runs in each forked worker process: the parent's locks may
+        # have been held at fork time, its flusher thread does not exist
+        # here, and events copied from its buffer belong to the parent
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(
+                target=self._run, name='auth-event-flusher', daemon=True
+            )
+            self._worker.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+auth_event_log = AuthEventLog(
+    capacity=app.config.get('AUTH_EVENT_BUFFER_SIZE'),
+    batch_size=app.config.get('AUTH_EVENT_BATCH_SIZE'),
+    flush_interval=app.config.get('AUTH_EVENT_FLUSH_INTERVAL')
+)
+
+
+def log_auth_event(event, outcome, status_code, email=None, user=None):
+    """
+    Records the outcome of an auth request for the current client.
+    Never raises, so logging cannot change the response.
+    """
+    try:
+        # email comes straight from the request body and may be any JSON
+        # value, including strings with lone surrogates BSON cannot encode
+        if isinstance(email, str):
+            email = email[:MAX_EMAIL_LENGTH]
+            email = email.encode('utf-8', 'replace').decode('utf-8')
+        else:
+            email = None
+        return auth_event_log.record({
+            'event': event,
+            'outcome': outcome,
+            'status_code': status_code,
+            'email': email,
+            'ip': request.remote_addr,
+            'user_id': user.id if user else None,
+            'created_on': datetime.datetime.utcnow(),
+        })
+    except Exception:
+        app.logger.exception('Failed to record auth event')
+        return False
@@ -125,4 +125,87 @@ class Item(db.DynamicDocument):
             closes_at = day_opening_timings.get("closes_at")
             if closes_at < opens_at or not isinstance(closes_at, int) or not isinstance(opens_at, int):
                 raise ValidationError("Invalid Opening and closing hours")
-    
\ No newline at end of file
+
+
+class AuthEvent(db.Document):
+    """
+    Auth Event Model for the login/register/logout audit trail.
+    Documents are written in batches by project.server.events and
+    expire after AUTH_EVENT_TTL_SECONDS.
+    """
+    event = StringField(required=True, choices=('register', 'login', 'logout'))
+    outcome = StringField(required=True, choices=('success', 'failure'))
+    status_code = IntField()
+    email = StringField()
+    ip = StringField()
+    user_id = IntField()
+    created_on = DateTimeField(default=datetime.datetime.utcnow)
+
+    meta = {
+        "collection": "auth_events",
+        "indexes": [
+            {
+                "fields": ["created_on"],
+                "expireAfterSeconds": app.config.get('AUTH_EVENT_TTL_SECONDS')
+            },
+            ("email", "created_on"),
+            ("ip", "created_on"),
+        ]
+    }
+
+    @staticmethod
+    def failure_rates(group_by='email', window=datetime.timedelta(minutes=5),
+                      since=None, event=None, min_failures=1, email=None, ip=None):
+        """
+        Aggregates attempts and failures per email/ip over time windows
+        :param group_by: 'email' or 'ip'
+        :param window: timedelta width of each bucket
+        :param since: datetime (UTC) lower bound, defaults to the last day
+        :param event: optionally restrict to 'register', 'login' or 'logout'
+        :param min_failures: drop buckets with fewer failures than this
+        :param email: optionally restrict to one email
+        :param ip: optionally restrict to one ip
+        :return: list of dicts, newest window first
+        """
+        if group_by not in ('email', 'ip'):
+            raise ValueError("group_by must be 'email' or 'ip'")
+        if since is None:
+            since = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        match = {'created_on': {'$gte': since}}
+        if event:
+            match['event'] = event
+        if email:
+            match['email'] = email
+        if ip:
+            match['ip'] = ip
+        window_ms = int(window.total_seconds() * 1000)
+        if window_ms <= 0:
+            raise ValueError("window must be at least one millisecond")
+        epoch = datetime.datetime(1970, 1, 1)
+        elapsed_ms = {'$subtract': ['$created_on', epoch]}
+        window_start = {'$add': [
+            epoch,
+            {'$subtract': [elapsed_ms, {'$mod': [elapsed_ms, window_ms]}]}
+        ]}
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': {'key': '$' + group_by, 'window_start': window_start},
+                'attempts': {'$sum': 1},
+                'failures': {'$sum': {
+                    '$cond': [{'$eq': ['$outcome', 'failure']}, 1, 0]
+                }}
+            }},
+            {'$match': {'failures': {'$gte': min_failures}}},
+            {'$sort': {'_id.window_start': -1, 'failures': -1}},
+        ]
+        return [
+            {
+                group_by: row['_id']['key'],
+                'window_start': row['_id']['window_start'],
+                'attempts': row['attempts'],
+                'failures': row['failures'],
+                'failure_rate': row['failures'] / row['attempts'],
+            }
+            for row in AuthEvent.objects.aggregate(pipeline)
+        ]
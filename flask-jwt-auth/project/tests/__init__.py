@@ -0,0 +1 @@
+# project/tests/__init__.py
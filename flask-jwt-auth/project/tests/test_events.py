@@ -0,0 +1,209 @@
+# project/tests/test_events.py
+
+
+import os
+import signal
+import threading
+import time
+import unittest
+from unittest import mock
+
+from bson import BSON
+
+from project.server import events
+from project.server.events import AuthEventLog, insert_auth_events, log_auth_event
+from project.server.models import AuthEvent
+from project.tests.base import BaseTestCase
+
+
+class FakeSink:
+    """ Collects batches instead of writing them to Mongo """
+
+    def __init__(self, rejected=0, error=None):
+        self.batches = []
+        self.rejected = rejected
+        self.error = error
+        self.called = threading.Event()
+
+    def __call__(self, documents):
+        self.called.set()
+        if self.error:
+            raise self.error
+        self.batches.append(list(documents))
+        return len(documents) - self.rejected
+
+
+class FakeCollection:
+    """ Encodes like pymongo's insert_many and keeps what it accepts """
+
+    def __init__(self):
+        self.documents = []
+
+    def insert_many(self, documents, ordered=True):
+        encoded = [BSON.encode(d, check_keys=True) for d in documents]
+        self.documents.extend(documents)
+        return encoded
+
+
+def stopped_log(sink, capacity=100, batch_size=2):
+    """
+    Returns a log whose flusher has already exited, so the test drives
+    flush() itself and batching is deterministic.
+    """
+    log = AuthEventLog(capacity, batch_size, flush_interval=60, sink=sink)
+    log._worker = threading.Thread(target=lambda: None)
+    log._worker.start()
+    log._worker.join()
+    return log
+
+
+class TestAuthEventLog(BaseTestCase):
+
+    def test_record_drops_when_full(self):
+        """ Test a full buffer drops new events and counts them """
+        sink = FakeSink()
+        log = AuthEventLog(capacity=2, batch_size=10, flush_interval=60, sink=sink)
+        self.assertTrue(log.record({'i': 0}))
+        self.assertTrue(log.record({'i': 1}))
+        self.assertFalse(log.record({'i': 2}))
+        stats = log.stats()
+        self.assertEqual(stats['recorded'], 2)
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['pending'], 2)
+        log.close()
+        self.assertEqual(sink.batches, [[{'i': 0}, {'i': 1}]])
+
+    def test_full_batch_wakes_flusher(self):
+        """ Test the flusher writes as soon as a batch fills """
+        sink = FakeSink()
+        log = AuthEventLog(capacity=10, batch_size=2, flush_interval=60, sink=sink)
+        log.record({'i': 0})
+        log.record({'i': 1})
+        self.assertTrue(sink.called.wait(5))
+        deadline = time.monotonic() + 5
+        while log.stats()['flushed'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(log.stats()['flushed'], 2)
+        log.close()
+
+    def test_flush_splits_into_batches(self):
+        """ Test flush drains the buffer in batch_size chunks """
+        sink = FakeSink()
+        log = stopped_log(sink, batch_size=2)
+        for i in range(5):
+            log.record({'i': i})
+        self.assertEqual(log.flush(), 5)
+        self.assertEqual([len(batch) for batch in sink.batches], [2, 2, 1])
+        self.assertEqual(log.stats()['pending'], 0)
+
+    def test_flush_counts_partial_inserts(self):
+        """ Test only rejected events are counted as failed """
+        sink = FakeSink(rejected=1)
+        log = stopped_log(sink, batch_size=2)
+        for i in range(4):
+            log.record({'i': i})
+        self.assertEqual(log.flush(), 2)
+        stats = log.stats()
+        self.assertEqual(stats['flushed'], 2)
+        self.assertEqual(stats['failed'], 2)
+
+    def test_flush_sink_error(self):
+        """ Test a failing sink loses only its batch and stops the flush """
+        sink = FakeSink(error=RuntimeError('down'))
+        log = stopped_log(sink, batch_size=2)
+        for i in range(5):
+            log.record({'i': i})
+        self.assertEqual(log.flush(), 0)
+        stats = log.stats()
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['flushed'], 0)
+        self.assertEqual(stats['pending'], 3)
+        sink.error = None
+        self.assertEqual(log.flush(), 3)
+
+    def test_close_drains_buffer(self):
+        """ Test close writes everything still buffered """
+        sink = FakeSink()
+        log = AuthEventLog(capacity=10, batch_size=10, flush_interval=60, sink=sink)
+        for i in range(3):
+            log.record({'i': i})
+        log.close()
+        self.assertEqual(sink.batches, [[{'i': 0}, {'i': 1}, {'i': 2}]])
+        self.assertEqual(log.stats()['pending'], 0)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+    def test_fork_resets_state(self):
+        """ Test a forked child starts clean even if a lock was held """
+        sink = FakeSink()
+        log = AuthEventLog(capacity=10, batch_size=10, flush_interval=60, sink=sink)
+        log.record({'i': 0})
+        log._lock.acquire()
+        pid = os.fork()
+        if pid == 0:
+            signal.alarm(5)
+            ok = False
+            try:
+                stats = log.stats()
+                ok = (
+                    stats['pending'] == 0 and stats['recorded'] == 0
+                    and log.record({'i': 1})
+                )
+                log.close()
+                ok = ok and sink.batches == [[{'i': 1}]]
+            finally:
+                os._exit(0 if ok else 1)
+        log._lock.release()
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertEqual(log.stats()['pending'], 1)
+        log.close()
+
+
+class TestInsertAuthEvents(BaseTestCase):
+
+    def test_skips_unencodable_documents(self):
+        """ Test one bad document does not sink the whole batch """
+        collection = FakeCollection()
+        documents = [
+            {'email': 'a@example.com'},
+            {'email': {'a.b': 1}},
+            {'email': '\ud800'},
+            {'email': 'b@example.com'},
+        ]
+        with mock.patch.object(AuthEvent, '_get_collection', return_value=collection):
+            self.assertEqual(insert_auth_events(documents), 2)
+        self.assertEqual(
+            [d['email'] for d in collection.documents],
+            ['a@example.com', 'b@example.com']
+        )
+
+
+class TestLogAuthEvent(BaseTestCase):
+
+    def record_email(self, email):
+        sink = FakeSink()
+        log = stopped_log(sink)
+        with mock.patch.object(events, 'auth_event_log', log):
+            with self.app.test_request_context('/auth/login', method='POST'):
+                self.assertTrue(log_auth_event('login', 'failure', 404, email))
+        log.flush()
+        return sink.batches[0][0]['email']
+
+    def test_non_string_email(self):
+        """ Test emails that are not strings are not stored """
+        self.assertIsNone(self.record_email({'$x': 1}))
+
+    def test_long_email(self):
+        """ Test emails are truncated """
+        email = self.record_email('a' * 1000)
+        self.assertEqual(len(email), events.MAX_EMAIL_LENGTH)
+
+    def test_surrogate_email(self):
+        """ Test lone surrogates are replaced so the event can be encoded """
+        email = self.record_email('a\ud800@example.com')
+        self.assertEqual(email, 'a?@example.com')
+        BSON.encode({'email': email})
+
+
+if __name__ == '__main__':
+    unittest.main()